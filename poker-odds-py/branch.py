@@ -1,36 +1,11 @@
+from math import comb
+from multiprocessing import Pool
+from typing import List
+
 from hand import Deck, Card, Game, Hand, Value, Suits
+from evaluator import PRIMES, PRODUCT_TABLE, SUIT_MASKS, WORST, eval_mask, prime_product
 
 
-class BinarySet:
-    '''
-    Efficient bit set implementation for holding Card types.
-    There are 52 cards in total, so we need no more than 52 bits
-    to represent the ownership of all cards. Each card has it's own
-    consistent index that will be used to determine existence
-    inside the set. More space and time efficient than stdlib set
-    as we leverage the constraint that we only store up to 52 cards.
-    '''
-    def __init__(self):
-        self.s: int = 0 # i64 as we use at most 52 bits.
-        self.length: int = 0
-
-    def add(self, card: Card):
-        if not self.contains(card):
-            self.s |= 1 << card.idx
-            self.length += 1
-
-    def remove(self, card: Card):
-        if self.contains(card):
-            self.s -= 1 << card.idx
-            self.length -= 1
-
-    def contains(self, card: Card) -> bool:
-        return (self.s >> card.idx) & 1 == 1
-
-    def __len__(self) -> int:
-        return self.length
-
-        
 class Brancher:
     def __init__(self,
                  game: Game,
@@ -38,61 +13,181 @@ class Brancher:
         self.game: Game = game
         self.hero: Hand = self.game.hands[self.game.hero_pos]
         self.villains: List[Hand] = [hand for i, hand in enumerate(self.game.hands) if i != self.game.hero_pos]
-        self.drawn: BinarySet = self.__init_drawn()
-        self.memo: dict[int, float] = {}
+        # Hole cards as masks of Card.idx bits, scored together with the board mask.
+        self.hero_mask: int = sum(card.bit for card in self.hero.hole)
+        self.villain_masks: List[int] = [sum(card.bit for card in villain.hole) for villain in self.villains]
+        self.drawn: int = self.__init_drawn()
 
     def __init_drawn(self) -> int:
-        _st = BinarySet()
+        '''Mask of the Card.idx bits of the board and every hole card.'''
+        drawn = 0
         for card in self.game.board:
-            _st.add(card)
+            drawn |= card.bit
 
         for hands in self.game.hands:
             for card in hands.hole:
-                _st.add(card)
-        return _st
-
-    def branch(self, debug=False) -> float:
-        if len(self.game.board) > 5:
+                drawn |= card.bit
+        return drawn
+
+    def branch(self, processes: int = 1) -> float:
+        '''
+        Hero equity over every completion of the board. With processes > 1
+        and at least two cards to come, the subtrees under each first card
+        dealt are counted in a pool of that many worker processes.
+        '''
+        board_len = len(self.game.board)
+        if board_len > 5:
             raise Exception("Board has more than 5 cards - invalid.")
 
-        b = self.board_to_bin
-        if b in self.memo:
-            return self.memo[b]
-
-        if len(self.game.board) == 5:
-            val = 0. if any(True for villain in self.villains if self.hero <= villain) else 1.
-            if debug and val == 1: # Debugging only!
-                print(self.game.board, self.hero.rank)
-                for villain in self.villains: print(villain.rank)
-            self.memo[b] = val
-            return val
-
-        pb = 0
-        ncards = len(self.game.deck)
-        for card in self.game.deck:
-            if self.drawn.contains(card):
-                continue
-            self.add_to_end_of_board(card)
-            pb += self.branch()
-            self.remove_from_end_of_board()
-
-        pb /= (ncards - len(self.drawn))
-        self.memo[b] = pb 
-        return pb 
-
-    def add_to_end_of_board(self, card):
-        self.game.board.append(card)
-        self.drawn.add(card)
-
-    def remove_from_end_of_board(self):
-        self.drawn.remove(self.game.board.pop())
-
-    @property 
-    def board_to_bin(self) -> int:
-        val = 0
+        board_mask = 0
         for card in self.game.board:
-            val |= 1 << card.idx 
-        return val
+            board_mask |= card.bit
+        # Sized once here, the recursion below only carries ints.
+        remaining = self.game.deck.mask & ~self.drawn
+        boards = comb(remaining.bit_count(), 5 - board_len)
+        if processes > 1 and board_len <= 3:
+            return self.__parallel_wins(board_mask, board_len, remaining, processes) / boards
+        return self._branch(board_mask, board_len, remaining) / boards
+
+    def __parallel_wins(self, board_mask: int, board_len: int, remaining: int, processes: int) -> int:
+        # One task per first card, each dealing the rest from the cards above it.
+        # The lowest cards have the most above them, so tasks go out one at a time.
+        tasks = []
+        rest = remaining
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            tasks.append((board_mask, board_len, bit, rest))
+        with Pool(processes, initializer=_init_worker, initargs=(self,)) as pool:
+            return sum(pool.imap_unordered(_worker_first_card_wins, tasks))
+
+    def _first_card_wins(self, board_mask: int, board_len: int, bit: int, rest: int) -> int:
+        '''Wins over the boards whose lowest new card is bit, the others from rest.'''
+        if board_len == 3:
+            return self._last_two(board_mask, bit | rest, turns=bit)
+        return self._branch(board_mask | bit, board_len + 1, rest)
+
+    def _branch(self, board_mask: int, board_len: int, remaining: int) -> int:
+        '''
+        Number of boards the hero wins out of every way to complete the board
+        from the cards in remaining, a 52-bit mask of Card.idx bits. A branch
+        only passes on the cards above the one it added, so each board is
+        dealt exactly once, in increasing card order, and needs no memo.
+        '''
+        if board_len == 5:
+            return 1 if self.__hero_wins(board_mask) else 0
+        if board_len == 4:
+            return self._last_one(board_mask, remaining)
+        if board_len == 3:
+            return self._last_two(board_mask, remaining)
+
+        wins = 0
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            wins += self._branch(board_mask | bit, board_len + 1, remaining)
+        return wins
+
+    def __hero_wins(self, board_mask: int) -> bool:
+        # Cactus-Kev scores, lower is better, and a tie is not a win.
+        hero_score = eval_mask(self.hero_mask | board_mask)
+        return all(hero_score < eval_mask(villain_mask | board_mask) for villain_mask in self.villain_masks)
+
+    def __hand_states(self, board_mask: int, to_come: int) -> List[tuple]:
+        '''
+        (known cards, their prime product, flush draws) of the hero and then
+        each villain, as read by _runout_score. A flush draw is a suit the
+        hand can still fill with to_come more cards, kept as the suit mask
+        and the number of cards of the suit it still needs.
+        '''
+        states = []
+        for hole_mask in [self.hero_mask] + self.villain_masks:
+            known = hole_mask | board_mask
+            draws = []
+            for suit_mask in SUIT_MASKS:
+                held = (known & suit_mask).bit_count()
+                if held >= 5 - to_come:
+                    draws.append((suit_mask, 5 - held))
+            states.append((known, prime_product(known), draws))
+        return states
+
+    def _last_one(self, board_mask: int, remaining: int) -> int:
+        '''Same as _branch for a four card board, dealing the river in a flat loop.'''
+        hero_state, *villain_states = self.__hand_states(board_mask, 1)
+        wins = 0
+        while remaining:
+            river = remaining & -remaining
+            remaining ^= river
+            river_prime = PRIMES[(river.bit_length() - 1) >> 2]
+            hero_score = _runout_score(hero_state, river, river_prime)
+            for villain_state in villain_states:
+                if _runout_score(villain_state, river, river_prime) <= hero_score:
+                    break
+            else:
+                wins += 1
+        return wins
+
+    def _last_two(self, board_mask: int, remaining: int, turns: int = -1) -> int:
+        '''
+        Same as _branch for a three card board, with the turn and river dealt
+        in one flat loop. Each hand's five known cards are folded once into a
+        prime product, so a runout costs one PRODUCT_TABLE lookup per hand.
+        Only a runout that can fill a suit the hand already holds three of
+        goes through the full eval_mask. The lower card of a runout is
+        restricted to the mask turns, all of remaining by default.
+        '''
+        hero_state, *villain_states = self.__hand_states(board_mask, 2)
+
+        cards = []
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            cards.append((bit, PRIMES[(bit.bit_length() - 1) >> 2]))
+
+        wins = 0
+        for i, (turn, turn_prime) in enumerate(cards):
+            if not turn & turns:
+                continue
+            # A river can only improve a villain's hand, so a river that
+            # leaves the hero no better than the best villain on the turn
+            # is lost without scoring the villains at all. The turn scores
+            # come off the same flop states as the runouts do.
+            # With no villains there is no bound, and every runout is a win.
+            turn_best = min((_runout_score(villain_state, turn, turn_prime) for villain_state in villain_states),
+                            default=WORST + 1)
+            for river, river_prime in cards[i + 1:]:
+                runout, runout_product = turn | river, turn_prime * river_prime
+                hero_score = _runout_score(hero_state, runout, runout_product)
+                if hero_score >= turn_best:
+                    continue
+                for villain_state in villain_states:
+                    if _runout_score(villain_state, runout, runout_product) <= hero_score:
+                        break
+                else:
+                    wins += 1
+        return wins
+
+
+def _runout_score(state: tuple, runout: int, runout_product: int) -> int:
+    '''Score of a hand state from Brancher.__hand_states with the runout cards added.'''
+    known, product, draws = state
+    for suit_mask, needed in draws:
+        if (runout & suit_mask).bit_count() >= needed:
+            return eval_mask(known | runout)
+    return PRODUCT_TABLE[product * runout_product]
+
+
+# The Brancher each worker process counts with, set once by the pool initializer.
+_worker_brancher = None
+
+
+def _init_worker(brancher: Brancher):
+    global _worker_brancher
+    _worker_brancher = brancher
+
+
+def _worker_first_card_wins(task) -> int:
+    return _worker_brancher._first_card_wins(*task)
 
 
 if __name__ == "__main__":
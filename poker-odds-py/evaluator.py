@@ -0,0 +1,279 @@
+'''
+Cactus-Kev style 5-card evaluator.
+
+Every card is packed into a single int:
+
+    xxxAKQJT 98765432 cdhsrrrr xxpppppp
+
+where the top 13 bits hold one bit for the card's value, cdhs is the
+suit bit, rrrr is the value index (0 for a two, 12 for an ace) and
+pppppp is the prime for that value. A 5-card hand is then scored by
+OR-ing its cards for a flush or five distinct values, and otherwise by
+multiplying the primes, which is unique per multiset of values.
+
+Scores run from 1 (royal flush) to 7462 (seven high) - lower is better.
+'''
+from itertools import combinations
+from typing import Dict, List, Sequence
+
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+# Index is the suit index used by Card.idx (clubs, hearts, spades, diamonds).
+SUIT_BITS = (0x8, 0x2, 0x1, 0x4)
+
+# Best score of each hand class.
+STRAIGHT_FLUSH = 1
+QUADS = 11
+FULL_HOUSE = 167
+FLUSH = 323
+STRAIGHT = 1600
+TRIPS = 1610
+TWO_PAIR = 2468
+PAIR = 3326
+HIGH_CARD = 6186
+WORST = 7462
+
+# Five-value masks of the straights, from ace high down to the wheel.
+STRAIGHTS = tuple(0b1111100000000 >> i for i in range(9)) + (0b1000000001111,)
+
+
+def card_int(cid: int) -> int:
+    '''Cactus-Kev int for a card id, (value - 2) * 4 + suit index.'''
+    r, s = cid >> 2, cid & 3
+    return PRIMES[r] | (r << 8) | (SUIT_BITS[s] << 12) | (1 << (16 + r))
+
+
+CARD_INTS = tuple(card_int(cid) for cid in range(52))
+
+
+def _build_tables():
+    '''
+    Walk the 7462 distinct hands from best to worst and hand out scores.
+    Flushes and five distinct values are keyed by their 13-bit value mask,
+    everything with a repeated value is keyed by its product of primes.
+    '''
+    flushes: List[int] = [0] * (STRAIGHTS[0] + 1)
+    unique5: List[int] = [0] * (STRAIGHTS[0] + 1)
+    products: Dict[int, int] = {}
+
+    values = range(12, -1, -1)
+    # Five distinct values that are not a straight, best first.
+    high_cards = []
+    for combo in combinations(values, 5):
+        mask = sum(1 << r for r in combo)
+        if mask not in STRAIGHTS:
+            high_cards.append(mask)
+
+    def product(*rs: int) -> int:
+        p = 1
+        for r in rs:
+            p *= PRIMES[r]
+        return p
+
+    score = STRAIGHT_FLUSH
+    for mask in STRAIGHTS:
+        flushes[mask] = score
+        score += 1
+    for q in values:
+        for k in values:
+            if k != q:
+                products[product(q, q, q, q, k)] = score
+                score += 1
+    for t in values:
+        for p in values:
+            if p != t:
+                products[product(t, t, t, p, p)] = score
+                score += 1
+    for mask in high_cards:
+        flushes[mask] = score
+        score += 1
+    for mask in STRAIGHTS:
+        unique5[mask] = score
+        score += 1
+    for t in values:
+        for k1, k2 in combinations([r for r in values if r != t], 2):
+            products[product(t, t, t, k1, k2)] = score
+            score += 1
+    for p1, p2 in combinations(values, 2):
+        for k in values:
+            if k != p1 and k != p2:
+                products[product(p1, p1, p2, p2, k)] = score
+                score += 1
+    for p in values:
+        for k1, k2, k3 in combinations([r for r in values if r != p], 3):
+            products[product(p, p, k1, k2, k3)] = score
+            score += 1
+    for mask in high_cards:
+        unique5[mask] = score
+        score += 1
+    assert score == WORST + 1
+    return flushes, unique5, products
+
+
+FLUSH_TABLE, UNIQUE5_TABLE, HASH_TABLE = _build_tables()
+
+
+def _build_seven_card_tables():
+    '''
+    Extend the 5-card tables to six and seven cards. A suited value mask with
+    more than five bits scores as its best 5-bit sub-mask, and a product of
+    six or seven primes as the best product it is one prime away from.
+    Both are filled upwards one card at a time from the 5-card scores.
+    '''
+    suited = FLUSH_TABLE + [0] * ((1 << 13) - len(FLUSH_TABLE))
+    for mask in range(1 << 13):
+        if mask.bit_count() > 5:
+            best = WORST + 1
+            m = mask
+            while m:
+                low = m & -m
+                best = min(best, suited[mask ^ low])
+                m ^= low
+            suited[mask] = best
+
+    products: Dict[int, int] = dict(HASH_TABLE)
+    for mask, score in enumerate(UNIQUE5_TABLE):
+        if score:
+            p = 1
+            for r in range(13):
+                if mask >> r & 1:
+                    p *= PRIMES[r]
+            products[p] = score
+    level = dict(products)
+    for _ in range(2):
+        grown: Dict[int, int] = {}
+        for p, score in level.items():
+            for prime in PRIMES:
+                # A fifth card of one value does not exist.
+                if p % prime ** 4:
+                    q = p * prime
+                    if score < grown.get(q, WORST + 1):
+                        grown[q] = score
+        products.update(grown)
+        level = grown
+    return suited, products
+
+
+# SUITED_TABLE[value mask of one suit], PRODUCT_TABLE[product of 5 to 7 primes].
+SUITED_TABLE, PRODUCT_TABLE = _build_seven_card_tables()
+
+# Card ids of each suit in a 52-bit mask, id being (value - 2) * 4 + suit index.
+SUIT_MASKS = tuple(sum(1 << (4 * r + s) for r in range(13)) for s in range(4))
+
+
+def _byte_primes(k: int) -> tuple:
+    '''Product of the primes of the card ids set in each value of byte k of a card mask.'''
+    table = []
+    for b in range(256):
+        p = 1
+        for j in range(8):
+            if b >> j & 1 and 8 * k + j < 52:
+                p *= PRIMES[(8 * k + j) >> 2]
+        table.append(p)
+    return tuple(table)
+
+
+_BYTE_PRIMES = tuple(_byte_primes(k) for k in range(7))
+
+
+def _byte_lanes(k: int) -> tuple:
+    '''
+    The card ids set in byte k of a card mask as four 16-bit suit lanes, bit
+    16s + r standing for value index r of suit s. OR-ing these per byte
+    regroups a mask by suit without walking its cards.
+    '''
+    table = []
+    for b in range(256):
+        lanes = 0
+        for j in range(8):
+            cid = 8 * k + j
+            if b >> j & 1 and cid < 52:
+                lanes |= 1 << (16 * (cid & 3) + (cid >> 2))
+        table.append(lanes)
+    return tuple(table)
+
+
+_BYTE_LANES = tuple(_byte_lanes(k) for k in range(7))
+
+
+def suit_lanes(cards_mask: int) -> int:
+    '''The value masks of the four suits of a 52-bit card mask, in 16-bit lanes.'''
+    b0, b1, b2, b3, b4, b5, b6 = _BYTE_LANES
+    m = cards_mask
+    return (b0[m & 0xFF] | b1[m >> 8 & 0xFF] | b2[m >> 16 & 0xFF] | b3[m >> 24 & 0xFF]
+            | b4[m >> 32 & 0xFF] | b5[m >> 40 & 0xFF] | b6[m >> 48])
+
+
+def eval5(c1: int, c2: int, c3: int, c4: int, c5: int) -> int:
+    '''Score five Cactus-Kev card ints.'''
+    q = (c1 | c2 | c3 | c4 | c5) >> 16
+    if c1 & c2 & c3 & c4 & c5 & 0xF000:
+        return FLUSH_TABLE[q]
+    r = UNIQUE5_TABLE[q]
+    if r:
+        return r
+    return HASH_TABLE[(c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF) * (c5 & 0xFF)]
+
+
+def eval_mask(cards_mask: int) -> int:
+    '''
+    Score the best five of five to seven cards given as a 52-bit mask of card
+    ids. With at most seven cards a flush rules out quads and full houses,
+    so a suit holding five cards decides the hand on its own, read off as
+    that suit's lane. Everything else is a single prime product lookup,
+    the product taken a byte at a time.
+    '''
+    for s, suit_mask in enumerate(SUIT_MASKS):
+        if (cards_mask & suit_mask).bit_count() >= 5:
+            return SUITED_TABLE[suit_lanes(cards_mask) >> (16 * s) & 0x1FFF]
+    return PRODUCT_TABLE[prime_product(cards_mask)]
+
+
+def prime_product(cards_mask: int) -> int:
+    '''Product of the value primes of the cards in a 52-bit mask of card ids.'''
+    b0, b1, b2, b3, b4, b5, b6 = _BYTE_PRIMES
+    m = cards_mask
+    return (b0[m & 0xFF] * b1[m >> 8 & 0xFF] * b2[m >> 16 & 0xFF] * b3[m >> 24 & 0xFF]
+            * b4[m >> 32 & 0xFF] * b5[m >> 40 & 0xFF] * b6[m >> 48])
+
+
+def eval_batch(known: Sequence[int], candidates: Sequence[int]) -> List[int]:
+    '''
+    Score known + [c] for every card int c in candidates, where known holds
+    four or more cards. Everything that does not depend on the candidate is
+    done once: the best five within known, and the OR, suit AND and prime
+    product of each four card subset. Each candidate then costs one table
+    lookup per four card subset.
+    '''
+    best = min((eval5(*five) for five in combinations(known, 5)), default=WORST + 1)
+    partials = [(c1 | c2 | c3 | c4,
+                 c1 & c2 & c3 & c4 & 0xF000,
+                 (c1 & 0xFF) * (c2 & 0xFF) * (c3 & 0xFF) * (c4 & 0xFF))
+                for c1, c2, c3, c4 in combinations(known, 4)]
+    scores = []
+    for c in candidates:
+        score = best
+        for ors, suits, product in partials:
+            q = (ors | c) >> 16
+            if suits & c:
+                r = FLUSH_TABLE[q]
+            else:
+                r = UNIQUE5_TABLE[q] or HASH_TABLE[product * (c & 0xFF)]
+            if r < score:
+                score = r
+        scores.append(score)
+    return scores
+
+
+def score_class(score: int) -> int:
+    '''Hand class of a score, numbered as hand.Rank (0 high card .. 9 royal flush).'''
+    if score == STRAIGHT_FLUSH:
+        return 9
+    for i, best in enumerate((QUADS, FULL_HOUSE, FLUSH, STRAIGHT, TRIPS, TWO_PAIR, PAIR, HIGH_CARD)):
+        if score < best:
+            return 8 - i
+    return 0
+
+
+# score_class of every score, so a cache miss in the callers is one index.
+SCORE_CLASSES = bytes(score_class(score) for score in range(WORST + 1))
@@ -1,29 +1,30 @@
 from enum import Enum
-from typing import List, Tuple
-from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
 import random
-from collections import defaultdict
-from functools import total_ordering
+from functools import lru_cache, total_ordering
 
+from evaluator import CARD_INTS, SCORE_CLASSES, WORST, eval_batch, eval_mask, suit_lanes
 
-@total_ordering
-class Rank(Enum):
-    HIGH_CARD = 0
-    PAIR = 1
-    TWO_PAIR = 2
-    TRIPS = 3
-    STRAIGHT = 4
-    FLUSH = 5
-    FULL_HOUSE = 6
-    QUADS = 7
-    STRAIGHT_FLUSH = 8
-    ROYAL_FLUSH = 9
 
-    def __lt__(self, other):
-        return self.value < other.value
+# Hand ranks are plain ints so comparing two hands is an int comparison.
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH, ROYAL_FLUSH = range(10)
+RANK_NAMES = ("HIGH_CARD", "PAIR", "TWO_PAIR", "TRIPS", "STRAIGHT",
+              "FLUSH", "FULL_HOUSE", "QUADS", "STRAIGHT_FLUSH", "ROYAL_FLUSH")
 
-    def __eq__(self, other):
-        return self.value == other.value
+
+class Rank:
+    '''Namespace for the hand ranks above, e.g. Rank.FLUSH. Use RANK_NAMES for display.'''
+    HIGH_CARD = HIGH_CARD
+    PAIR = PAIR
+    TWO_PAIR = TWO_PAIR
+    TRIPS = TRIPS
+    STRAIGHT = STRAIGHT
+    FLUSH = FLUSH
+    FULL_HOUSE = FULL_HOUSE
+    QUADS = QUADS
+    STRAIGHT_FLUSH = STRAIGHT_FLUSH
+    ROYAL_FLUSH = ROYAL_FLUSH
 
 
 class Suits(Enum):
@@ -63,40 +64,46 @@ class Value(Enum):
         return hash(self.value)
 
 
-class Constants:
-    ROYAL_FLUSH_VALUES = {Value.TEN, Value.JACK, Value.QUEEN, Value.KING, Value.ACE}
+# Ten through ace in a 13-bit value mask, bit i being the card value i + 2.
+ROYAL_MASK = (1 << 8) | (1 << 9) | (1 << 10) | (1 << 11) | (1 << 12)
+
+
+# Suit index used in Card.idx.
+SUIT_IDX = {Suits.CLUBS: 0, Suits.HEARTS: 1, Suits.SPADES: 2, Suits.DIAMONDS: 3}
 
 
-@dataclass
 class Card:
-    value: Value
-    suit: Suits
+    __slots__ = ('value', 'suit', 'idx', 'bit')
 
-    def __post_init__(self):
-        if isinstance(self.value, int):
+    def __init__(self, value: Value, suit: Suits):
+        if isinstance(value, int):
             try:
-                self.value = Value(self.value)
+                value = Value(value)
             except ValueError:
-                raise ValueError(f"Invalid card value: {self.value}")
-        
-        if self.value not in Value:
-            raise ValueError(f"Invalid card value: {self.value}")
+                raise ValueError(f"Invalid card value: {value}")
 
-        self._idx = None 
-        
-    @property
-    def idx(self):
-        if self._idx is None:
-            _idx = self.value.value * 4 - 8 # sub 8 to start from 0
-            for i, s in enumerate(Suits):
-                if self.suit == s:
-                    _idx += i
-                    break
-            self._idx = _idx
-        return self._idx
+        if not isinstance(value, Value):
+            raise ValueError(f"Invalid card value: {value}")
+
+        self.value: Value = value
+        self.suit: Suits = suit
+        # Consistent index in [0, 52), used for bit sets of cards.
+        self.idx: int = (value.value - 2) * 4 + SUIT_IDX[suit]
+        # The card's bit in a mask of Card.idx bits, to OR in directly.
+        self.bit: int = 1 << self.idx
+
+    @classmethod
+    def from_id(cls, cid: int) -> 'Card':
+        '''The shared Card for an id, e.g. to print the ids held by a Deck.'''
+        return _CARDS[cid]
+
+    def __eq__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.idx == other.idx
 
     def __hash__(self):
-        return hash((self.value.value, self.suit.value))
+        return hash(self.idx)
 
     def __str__(self):
         return str(self.value.value) + str(self.suit.value)
@@ -105,35 +112,271 @@ class Card:
         return self.__str__()
 
 
+# One Card per id, in Card.idx order.
+_CARDS = tuple(Card(v, s) for v in Value for s in Suits)
+
+
+# Every Card.idx bit, i.e. a full deck as a card mask.
+FULL_DECK = (1 << 52) - 1
+
+
 @dataclass
 class Deck:
-    cards: List[Card] = field(default_factory=list) 
+    '''
+    The cards left are stored as a 52-bit mask of Card.idx bits rather than
+    as Card objects. Iterating yields the ids in increasing order; Card.from_id
+    gives the Card. Drawing picks any card left at random, which deals the
+    same as popping a shuffled deck.
+    '''
+    mask: int = 0
 
     def __post_init__(self):
-        if not self.cards:
-            self.cards = [Card(v, s) for v in Value for s in Suits] 
-            self.shuffle()
+        if not self.mask:
+            self.mask = FULL_DECK
 
     def __len__(self):
         '''Convenience function.'''
-        return len(self.cards)
+        return self.mask.bit_count()
 
     def __iter__(self):
-        for card in self.cards:
-            yield card
+        m = self.mask
+        while m:
+            low = m & -m
+            yield low.bit_length() - 1
+            m ^= low
 
     def append(self, card: Card):
-        self.cards.append(card)
-    
-    def shuffle(self):
-        random.shuffle(self.cards)
-    
+        self.mask |= card.bit
+
     def draw(self) -> Card:
-        _card = self.cards.pop()
-        print(f"Drew {_card}. {len(self.cards)} cards left.")
+        if not self.mask:
+            raise IndexError("draw from an empty deck")
+        while True:
+            cid = random.getrandbits(6)
+            if self.mask >> cid & 1:
+                break
+        self.mask ^= 1 << cid
+        _card = Card.from_id(cid)
+        print(f"Drew {_card}. {len(self)} cards left.")
         return _card
 
 
+def eval_from_state(rank_counts: List[int], suit_bb: List[int]) -> Tuple[int, int]:
+    '''
+    Rank a set of cards given as its per-value counts and per-suit bitboards.
+    Index i of rank_counts, and bit i of each suit bitboard, is the card value i + 2.
+    Returns a (rank, kicker) pair - each _is_* check below returns the kicker
+    when the hand matches and None otherwise.
+
+    Any number of cards can be ranked, but _eval_hand sends five or more to
+    evaluator.eval_mask, so in this module it only serves partial hands of
+    up to four cards, e.g. the preflop outs. Those never hold a flush, a
+    straight or a full house; the checks stay so any state ranks correctly.
+    '''
+    # At most one suit can hold five of seven cards, 0 if none does. A plain
+    # loop over the popcounts, as a generator costs more than the counting.
+    flush_bb = 0
+    for bb in suit_bb:
+        if bb.bit_count() >= 5:
+            flush_bb = bb
+            break
+    # Most hands have no flush, so the whole flush family is skipped for them.
+    if flush_bb:
+        if flush_bb & ROYAL_MASK == ROYAL_MASK:
+            return ROYAL_FLUSH, 0
+        if (kicker := _is_straight_flush(flush_bb)) is not None:
+            return STRAIGHT_FLUSH, kicker
+    # The largest count decides which families are still possible, so only
+    # the checks that can match are run.
+    top = max(rank_counts)
+    if top == 4:
+        return QUADS, _is_quads(rank_counts)
+    if top == 3 and (kicker := _is_full_house(rank_counts)) is not None:
+        return FULL_HOUSE, kicker
+    if flush_bb:
+        # The flush's five highest bits, which orders flushes by their best five cards.
+        return FLUSH, _TOP_FIVE[flush_bb]
+    rmask = suit_bb[0] | suit_bb[1] | suit_bb[2] | suit_bb[3]
+    if (kicker := _is_straight(rmask)) is not None:
+        return STRAIGHT, kicker
+    if top == 3:
+        return TRIPS, _is_three_of_a_kind(rank_counts)
+    if top == 2:
+        if (kicker := _is_two_pair(rank_counts)) is not None:
+            return TWO_PAIR, kicker
+        return PAIR, _is_pair(rank_counts)
+    # No value is held twice, so the best five cards are the five highest bits.
+    return HIGH_CARD, _TOP_FIVE[rmask]
+
+
+def _straight_high(mask: int) -> int:
+    '''
+    Value of the top card of the best straight in a 13-bit value mask, or 0.
+
+    The mask is shifted up by one with the ace copied into bit 0, as the ace
+    also counts as 1 in a straight. Bit j then stands for value j + 1 and a
+    bit that survives AND-ing the mask with its four next shifts starts a run
+    of five, so the highest surviving bit j gives a straight to value j + 5.
+    '''
+    mask = (mask << 1) | (mask >> 12)
+    hit = mask & (mask >> 1) & (mask >> 2) & (mask >> 3) & (mask >> 4)
+    return hit.bit_length() + 4 if hit else 0
+
+
+def _top_five(mask: int) -> int:
+    '''The mask cut down to its five highest bits.'''
+    while mask.bit_count() > 5:
+        mask &= mask - 1
+    return mask
+
+
+# Both looked up by any 13-bit value mask, so straights and best-five
+# kickers cost a single index instead of Python-level bit twiddling.
+_STRAIGHT_HIGH = tuple(_straight_high(m) for m in range(1 << 13))
+_TOP_FIVE = tuple(_top_five(m) for m in range(1 << 13))
+
+
+def _is_straight_flush(flush_bb: int) -> Optional[int]:
+    high = _STRAIGHT_HIGH[flush_bb]
+    if high:
+        return high
+    return None 
+
+
+def _is_quads(rank_counts: List[int]) -> Optional[int]:
+    if 4 in rank_counts:
+        return _compute_kicker_as_best_five((rank_counts.index(4),), 1, rank_counts)
+    return None
+
+
+def _is_full_house(rank_counts: List[int]) -> Optional[int]:
+    '''
+    For calculation of the kicker:
+
+    The highest three-of-a-kind comes first, followed by the highest
+    other value held at least twice - which can be a second three-of-a-kind.
+   
+    For example, if we want to compute aces-over-kings is better than kings-over-aces,
+    each hand will have the following kicker representation:
+    Aces-over-kings: (14, 13) --> kicker = 1413.
+    Kings-over-aces: (13, 14) --> kicker = 1314.
+    Comparing the kickers here, we have Aces-over-kings > Kings-over-aces.
+    '''
+    # One pass from the ace down; once the highest trips is taken, a second
+    # trips counts as the pair.
+    trips = pair = -1
+    for i in range(12, -1, -1):
+        count = rank_counts[i]
+        if count == 3 and trips < 0:
+            trips = i
+        elif count >= 2 and pair < 0:
+            pair = i
+        else:
+            continue
+        if trips >= 0 and pair >= 0:
+            return _compute_kicker_as_best_five((trips, pair), 0, rank_counts)
+    return None
+    
+
+def _is_straight(rmask: int) -> Optional[int]:
+    high = _STRAIGHT_HIGH[rmask]
+    if high:
+        return high
+    return None
+
+
+def _is_three_of_a_kind(rank_counts: List[int]) -> Optional[int]:
+    if 3 not in rank_counts:
+        return None
+
+    return _compute_kicker_as_best_five((rank_counts.index(3),), 2, rank_counts)
+    
+
+def _is_two_pair(rank_counts: List[int]) -> Optional[int]:
+    '''
+    For the kicker - the 100000s and 10000s positions correspond to highest pair,
+    the 1000s and 100s positions correspond to value of second highest pair and
+    the 10s and 1s positions to the best remaining card, which may come from a
+    third pair. This way, we can numerically compute the relative strength between
+    multiple 2 pair hands by comparing this numeric value.
+    
+    Example, AcAdJdJs9h corresponds to the value: 141109.
+    The 14 is from the pair of aces and the 11 is from the pair of jacks.
+    Suppose we have another hand AcAdQdQs2h, this has value: 141202.
+    By comparing the kicker value, we can see that 141202 > 141109 so AcAdQdQs2h
+    is the winner.
+    '''
+    high = -1
+    for i in range(12, -1, -1):
+        if rank_counts[i] == 2:
+            if high >= 0:
+                return _compute_kicker_as_best_five((high, i), 1, rank_counts)
+            high = i
+    return None
+
+
+def _is_pair(rank_counts: List[int]) -> Optional[int]:
+    if 2 in rank_counts:
+        return _compute_kicker_as_best_five((rank_counts.index(2),), 3, rank_counts)
+    return None
+
+
+def _compute_kicker_as_best_five(lead: Tuple[int, ...], nrest: int, rank_counts: List[int]) -> int:
+    '''
+    Each card value takes two decimal digits, starting with the value indexes
+    in lead that the hand is made of (e.g. the pair), followed by the nrest
+    highest other values held, which fill up the best five cards.
+    '''
+    _kicker = 0
+    for i in lead:
+        _kicker = _kicker * 100 + i + 2
+    for i in range(12, -1, -1):
+        if nrest == 0:
+            break
+        if rank_counts[i] and i not in lead:
+            _kicker = _kicker * 100 + i + 2
+            nrest -= 1
+    return _kicker
+
+
+def hand_state(cids: List[int]) -> Tuple[List[int], List[int]]:
+    '''The (rank_counts, suit_bb) state read by eval_from_state for some card ids.'''
+    rank_counts = [0] * 13
+    suit_bb = [0] * 4
+    for cid in cids:
+        rank_counts[cid >> 2] += 1
+        suit_bb[cid & 3] |= 1 << (cid >> 2)
+    return rank_counts, suit_bb
+
+
+def hand_state_from_mask(cards_mask: int) -> Tuple[List[int], List[int]]:
+    '''
+    Same as hand_state, read straight off a 52-bit mask of Card.idx bits.
+    The suit bitboards are the evaluator's 16-bit suit lanes, and each value
+    count is the popcount of that value's four suit bits.
+    Only _eval_hand calls it, for the partial hands of up to four cards.
+    '''
+    rank_counts = [(cards_mask >> (4 * r) & 0xF).bit_count() for r in range(13)]
+    lanes = suit_lanes(cards_mask)
+    return rank_counts, [lanes & 0x1FFF, (lanes >> 16) & 0x1FFF, (lanes >> 32) & 0x1FFF, lanes >> 48]
+
+
+@lru_cache(maxsize=1 << 20)
+def _eval_hand(cards_key: int) -> Tuple[int, int]:
+    '''
+    (rank, kicker) of the cards in a 52-bit mask of Card.idx bits. The result
+    only depends on the set of cards, so the cache is shared by every Hand,
+    and it is bounded so long simulations do not grow it without limit.
+    '''
+    if cards_key.bit_count() >= 5:
+        # Five to seven cards are a few table lookups, cheaper than the
+        # bitboard checks. Table scores count up from the best hand, so flip
+        # them to keep a higher kicker winning.
+        score = eval_mask(cards_key)
+        return SCORE_CLASSES[score], WORST - score
+    return eval_from_state(*hand_state_from_mask(cards_key))
+
+
 @total_ordering
 class Hand:
     def __init__(self,
@@ -142,158 +385,109 @@ class Hand:
                 ):
         self.hole = hole
         self.board = board
-        self.memo = {}
+        self._hole_mask: int = hole[0].bit | hole[1].bit
         self.kicker: int = 0
     
     @property
-    def rank(self) -> Rank:
-        cards = list(self.hole) + self.board 
-        # Get binary representation of this set of cards combination.
-        cards_key = sum(1 << card.idx for card in cards)
-        
-        if cards_key in self.memo:
-            return self.memo[cards_key]
-
-        suits = {Suits.CLUBS: [], Suits.HEARTS: [], Suits.SPADES: [], Suits.DIAMONDS: []}
-        values = defaultdict(int)
-
-        for card in cards:
-            suits[card.suit].append(card.value)
-            values[card.value] += 1
-
-        values = sorted(((k.value, v) for k, v in values.items()), key=lambda x: (x[1], x[0]))
-
-        _rank = None
-        if self.__is_royal_flush(suits):
-            _rank = Rank.ROYAL_FLUSH
-        elif self.__is_straight_flush(suits):
-            _rank = Rank.STRAIGHT_FLUSH
-        elif self.__is_quads(values):
-            _rank = Rank.QUADS
-        elif self.__is_full_house(values):
-            _rank = Rank.FULL_HOUSE
-        elif self.__is_flush(suits):
-            _rank = Rank.FLUSH
-        elif self.__is_straight(values):
-            _rank = Rank.STRAIGHT
-        elif self.__is_three_of_a_kind(values):
-            _rank = Rank.TRIPS
-        elif self.__is_two_pair(values):
-            _rank = Rank.TWO_PAIR
-        elif self.__is_pair(values):
-            _rank = Rank.PAIR
-        else:
-            self.__compute_kicker_as_best_five(5, values)
-            _rank = Rank.HIGH_CARD
-        self.memo[cards_key] = _rank
+    def rank(self) -> int:
+        _rank, self.kicker = self._evaluate_board()
         return _rank
 
-    def __is_royal_flush(self, suits: dict[Suits, List[Value]]) -> bool:
-        for suit, values in suits.items():
-            if Constants.ROYAL_FLUSH_VALUES.issubset(values):
-                return True
-        return False
-
-    def __is_straight_flush(self, suits: dict[Suits, List[Value]]) -> bool:
-        for suit, values in suits.items():
-            if len(values) >= 5:
-                values = sorted(v.value for v in values)
-                # Ace also counts as 1 in a straight flush 
-                if values[-1] == 14:
-                    values.insert(0, 1)
-                for i in range(len(values) - 5, -1, -1): # iterate from back
-                    if values[i+4] - values[i] == 4:
-                        self.kicker = values[i+4]
-                        return True
-        return False 
-
-    def __is_quads(self, values: List[Tuple[int, int]]) -> bool:
-        if values[-1][1] == 4:
-            self.__compute_kicker_as_best_five(2, values)
-            return True 
-        return False
-
-    def __is_full_house(self, values: List[Tuple[int, int]]) -> bool:
-        '''
-        For calculation of the kicker:
-
-        The last item of _values corresponds to the highest three-of-a-kind,
-        and the second last item corresponds to the highest pair.
-        As we first sorted by value count and then by the value of the card.
-       
-        For example, if we want to compute aces-over-kings is better than kings-over-aces,
-        each hand will have the following kicker representation:
-        Aces-over-kings: _values[-2:] = [(2, 13), (3, 14)] --> kicker = 1413.
-        Kings-over-aces: _values[-2:] = [(2, 14), (3, 13)] --> kicker = 1314.
-        Comparing the kickers here, we have Aces-over-kings > Kings-over-aces.
-        '''
-        if values[-2][1] >= 2 and values[-1][1] >= 3:
-            self.__compute_kicker_as_best_five(2, values)
-            return True
-        return False
-        
-    def __is_flush(self, suits: dict[Suits, List[Value]]) -> bool:
-        for v in suits.values():
-            if len(v) >= 5:
-                self.kicker = max(v)
-                return True
-        return False
-
-    def __is_straight(self, values: List[Tuple[int, int]]) -> bool:
-        keys = sorted([k for k, v in values if v > 0])
-        # Ace also counts as 1 in a straight. 
-        if Value.ACE.value == keys[-1]:
-            keys.insert(0, 1)
-
-        for i in range(len(keys) - 5, -1, -1):
-            if keys[i+4] - keys[i] == 4:
-                self.kicker = keys[i+4]
-                return True
-        return False
-
-    def __is_three_of_a_kind(self, values: List[Tuple[int, int]]) -> bool:
-        if values[-1][1] < 3:
-            return False
-
-        self.__compute_kicker_as_best_five(3, values)
-        return True 
-        
-    def __is_two_pair(self, values: List[Tuple[int, int]]) -> bool:
+    def _evaluate_board(self) -> Tuple[int, int]:
+        '''(rank, kicker) on the current board, built without joining hole and board.'''
+        cards_mask = self._hole_mask
+        for card in self.board:
+            cards_mask |= card.bit
+        return _eval_hand(cards_mask)
+
+    def evaluate(self, board_mask: int) -> Tuple[int, int]:
         '''
-        For the kicker - the 1000s and 100s positions correspond to highest pair
-        and the 10s and 1s positions correspond to value of second highest pair.
-        This way, we can numerically compute the relative strength between multiple
-        2 pair hands by comparing this numeric value.
-        
-        Example, AcAdJdJs corresponds to the value: 1411.
-        The 14 is from the pair of aces and the 11 is from the pair of jacks.
-        Suppose we have another hand AcAdQdQs, this has value: 1412.
-        By comparing the kicker value, we can see that 1412 > 1411 so AcAdQdQs
-        is the winner.
+        Rank the hole cards together with the board given as a mask of Card.idx bits.
+        Returns a (rank, kicker) pair, which compares the same way as Hand.
         '''
-        if len(values) > 1 and values[-1][1] == 2 and values[-2][1] == 2:
-            self.__compute_kicker_as_best_five(3, values)
-            return True
-        return False
-
-    def __is_pair(self, values: List[Tuple[int, int]]) -> bool:
-        if values[-1][1] == 2:
-            self.__compute_kicker_as_best_five(4, values)
-            return True
-        return False
-
-    def __compute_kicker_as_best_five(self, ubound: int, values: List[Tuple[int, int]]):
-        _kicker = 0
-        for i in range(min(ubound, len(values))):
-            _kicker *= 100
-            _kicker += values[len(values)-i-1][0]
-        self.kicker = _kicker
+        return _eval_hand(self._hole_mask | board_mask)
         
     def __lt__(self, other):
-        return self.rank < other.rank or (self.rank == other.rank and self.kicker < other.kicker)
+        return self._evaluate_board() < other._evaluate_board()
 
     def __eq__(self, other):
-        return self.rank == other.rank and self.kicker == other.kicker
+        return self._evaluate_board() == other._evaluate_board()
+
+
+def _outs_kernel(holes: List[Tuple[int, int]],
+                 hero_pos: int,
+                 board_ids: List[int],
+                 deck_ids: List[int],
+                ) -> List[int]:
+    '''
+    The ids in deck_ids that leave no villain ahead of the hero once dealt.
+    This is the inner loop of Game.outs_one_street and only touches ints:
+    every hand gets a column of int scores, one per candidate card, where a
+    higher score is a better hand.
+    '''
+    columns = []
+    if len(board_ids) >= 2:
+        # Four or more known cards per hand, so all candidates of a hand are
+        # scored in one batch. Table scores are flipped to keep higher better.
+        deck_ints = [CARD_INTS[cid] for cid in deck_ids]
+        for hole in holes:
+            known = [CARD_INTS[cid] for cid in hole] + [CARD_INTS[cid] for cid in board_ids]
+            columns.append([WORST - score for score in eval_batch(known, deck_ints)])
+    else:
+        # Three or four cards per hand, ranked on the bitboard path. Only the
+        # candidate card changes between iterations, so keep the hand's state
+        # for its hole cards plus the board and add/remove it.
+        for hole in holes:
+            rank_counts, suit_bb = hand_state(list(hole) + board_ids)
+            column = []
+            # Bound once per hand rather than looked up per candidate.
+            append, evaluate = column.append, eval_from_state
+            for cid in deck_ids:
+                r, s, bit = cid >> 2, cid & 3, 1 << (cid >> 2)
+                rank_counts[r] += 1
+                suit_bb[s] |= bit
+                _rank, kicker = evaluate(rank_counts, suit_bb)
+                append((_rank << 32) | kicker)
+                rank_counts[r] -= 1
+                suit_bb[s] &= ~bit
+            columns.append(column)
+
+    hero_column = columns[hero_pos]
+    villain_columns = [column for i, column in enumerate(columns) if i != hero_pos]
+    outs = []
+    for j, cid in enumerate(deck_ids):
+        hero_score = hero_column[j]
+        for column in villain_columns:
+            if hero_score < column[j]:
+                break
+        else:
+            outs.append(cid)
+    return outs
+
+
+def _showdown_wins(hole_masks: List[int],
+                   hero_pos: int,
+                   board_mask: int,
+                   samples: List[List[int]],
+                  ) -> int:
+    '''
+    Number of samples, each the card ids completing the board, in which the
+    hero beats every villain. Like _outs_kernel this only touches ints.
+    '''
+    hero_mask = hole_masks[hero_pos]
+    villain_masks = [mask for i, mask in enumerate(hole_masks) if i != hero_pos]
+    wins = 0
+    for sample in samples:
+        mask = board_mask
+        for cid in sample:
+            mask |= 1 << cid
+        hero_eval = _eval_hand(hero_mask | mask)
+        for villain_mask in villain_masks:
+            if hero_eval <= _eval_hand(villain_mask | mask):
+                break
+        else:
+            wins += 1
+    return wins
 
 
 class Game:
@@ -315,20 +509,38 @@ class Game:
     def outs_one_street(self) -> List[Card]:
         if len(self.board) >= 5:
             return []
-        outs = []
-        hero = self.hands[self.hero_pos]
-        for card in self.deck:
-            self.board.append(card)
-            if not any(True for (i, villain) in enumerate(self.hands) if hero < villain and i != self.hero_pos):
-                outs.append(card)
-            self.board.pop()
-        return outs
+        # Cards are only ids from here on, mapped back to Card objects at the end.
+        out_ids = _outs_kernel([tuple(card.idx for card in hand.hole) for hand in self.hands],
+                               self.hero_pos,
+                               [card.idx for card in self.board],
+                               list(self.deck),
+                               )
+        return [Card.from_id(cid) for cid in out_ids]
 
     def compute_odds(self) -> float:
         outs = self.outs_one_street()
         print(f"Outs are {outs}.")
         return len(outs)/len(self.deck)
 
+    def monte_carlo_odds(self, n_samples: int) -> float:
+        '''
+        Estimate the hero's chance of winning at showdown by dealing the rest
+        of the board at random n_samples times. Ties count as losses.
+        '''
+        if n_samples <= 0:
+            raise ValueError(f"Invalid number of samples: {n_samples}")
+        board_mask = 0
+        for card in self.board:
+            board_mask |= card.bit
+        hole_masks = [hand._hole_mask for hand in self.hands]
+        used = board_mask
+        for hole_mask in hole_masks:
+            used |= hole_mask
+        available = [cid for cid in range(52) if not used >> cid & 1]
+        ndraw = 5 - len(self.board)
+        samples = [random.sample(available, ndraw) for _ in range(n_samples)]
+        return _showdown_wins(hole_masks, self.hero_pos, board_mask, samples) / n_samples
+
     def draw_board(self):
         '''
         Randomly draw from the deck.
@@ -378,14 +590,14 @@ if __name__ == '__main__':
     
     # Flop
     game.draw_board()
-    print(hand.rank, hand.board)
+    print(RANK_NAMES[hand.rank], hand.board)
     print(game.compute_odds())
 
     # Turn
     game.draw_board()
-    print(hand.rank, hand.board)
+    print(RANK_NAMES[hand.rank], hand.board)
     print(game.compute_odds())
 
     # River
     game.draw_board()
-    print(hand.rank, hand.board)
+    print(RANK_NAMES[hand.rank], hand.board)